@@ -1,27 +1,86 @@
+import logging
 import os
 import tempfile
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from flask import Flask, render_template, request, jsonify
-from werkzeug.utils import secure_filename
-from dotenv import load_dotenv
-from transcription import transcribe_file
-from processing import process_food_text
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.exceptions import RequestEntityTooLarge
+from transcription import transcribe_file, SUPPORTED_FORMATS
+from processing import process_food_text, warm_up
 from storage import store_food_data, get_today_entries, get_daily_totals
 
-# Load environment variables from .env file
-load_dotenv()
+# .env was already loaded by groq_client, imported above through transcription/processing
+
+# Debug/info logs are skipped unless LOG_LEVEL asks for them; unknown names fall back to WARNING
+_log_level = os.getenv('LOG_LEVEL', 'WARNING').upper()
+logging.basicConfig(level=_log_level if isinstance(logging.getLevelName(_log_level), int) else logging.WARNING)
+log = logging.getLogger(__name__)
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Serve jsonify responses through orjson instead of the stdlib json module"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1MB reads when copying uploads to disk
+
+# Keep temporary uploads on tmpfs when available so transcription reads them from RAM
+UPLOAD_TEMP_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# Single worker so entries are written in the order they were logged
+_STORAGE_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+
+# Same extensions transcribe_file accepts, so the two checks cannot drift apart
+ALLOWED_EXTENSIONS = SUPPORTED_FORMATS
+
+def _file_extension(filename) -> str:
+    """Lowercase extension after the last dot, or '' if there is none"""
+    _, dot, extension = filename.rpartition('.')
+    return extension.lower() if dot else ''
+
 def allowed_file(filename):
     """Check if file is a supported audio file"""
-    supported_formats = ['.wav', '.webm', '.mp3', '.m4a', '.ogg']
-    return any(filename.lower().endswith(fmt) for fmt in supported_formats)
+    return _file_extension(filename) in ALLOWED_EXTENSIONS
+
+def _save_upload_stream(stream, destination, max_bytes=None) -> int:
+    """
+    Copy an upload stream to an open file in fixed-size chunks, enforcing max_bytes
+    even when the request has no Content-Length (e.g. chunked transfer encoding)
+    """
+    written = 0
+    while True:
+        chunk = stream.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        written += len(chunk)
+        if max_bytes is not None and written > max_bytes:
+            raise RequestEntityTooLarge()
+        destination.write(chunk)
+    return written
+
+def _report_storage_failure(future):
+    """Log background storage errors, which can no longer reach the client"""
+    error = future.exception()
+    if error is not None:
+        log.error("Failed to store food entry", exc_info=error)
+
+def _wait_for_pending_storage():
+    """Block until queued entries are written so reads include them"""
+    _STORAGE_EXECUTOR.submit(lambda: None).result()
 
 @app.route('/')
 def index():
     """Main page with recording interface and today's entries"""
+    _wait_for_pending_storage()
     today_entries = get_today_entries()
     daily_totals = get_daily_totals()
     return render_template('index.html', entries=today_entries, daily_totals=daily_totals)
@@ -30,55 +89,69 @@ def index():
 def upload_audio():
     """Handle audio file upload and process through the pipeline"""
     try:
-        # Check if audio file was uploaded
-        if 'audio' not in request.files:
-            return jsonify({'error': 'No audio file provided'}), 400
+        if request.mimetype.startswith('multipart/'):
+            # Form upload - Werkzeug's multipart parser has already buffered the file (in memory,
+            # or spooled to disk when large) before it is copied below; only raw bodies stream
+            if 'audio' not in request.files:
+                return jsonify({'error': 'No audio file provided'}), 400
+            file = request.files['audio']
+            filename, source = file.filename, file.stream
+        else:
+            # Raw audio body - streamed straight to disk, filename passed in the query string
+            filename, source = request.args.get('filename', ''), request.stream
         
-        file = request.files['audio']
-        if file.filename == '' or not allowed_file(file.filename):
+        if filename == '' or not allowed_file(filename):
             return jsonify({'error': 'Please select a supported audio file (WAV, WebM, MP3, etc.)'}), 400
         
-        # Save uploaded file temporarily
-        filename = secure_filename(file.filename)
-        temp_dir = tempfile.mkdtemp()
-        temp_path = os.path.join(temp_dir, filename)
-        file.save(temp_path)
+        # Save uploaded audio temporarily, keeping only the (already validated) extension
+        suffix = '.' + _file_extension(filename)
+        temp_file = tempfile.NamedTemporaryFile(suffix=suffix, dir=UPLOAD_TEMP_DIR, delete=False)
         
         try:
+            with temp_file:
+                _save_upload_stream(source, temp_file, app.config['MAX_CONTENT_LENGTH'])
+            
             # Step 1: Transcribe audio
-            transcription = transcribe_file(temp_path)
+            transcription = transcribe_file(temp_file.name)
             
             # Step 2: Process food description
             parsed_data = process_food_text(transcription)
             
-            # Step 3: Store food data
-            store_food_data(parsed_data['items'])
+            # Step 3: Store food data in the background - the response doesn't depend on it.
+            # 'success' therefore covers transcription and parsing only: a write that fails
+            # later is logged by _report_storage_failure, not reported to this client
+            timestamp = datetime.now()
+            store_future = _STORAGE_EXECUTOR.submit(store_food_data, parsed_data['items'], timestamp)
+            store_future.add_done_callback(_report_storage_failure)
             
             # Return success response
             return jsonify({
                 'success': True,
                 'transcription': transcription,
                 'items': parsed_data['items'],
-                'timestamp': datetime.now().isoformat()
+                'timestamp': timestamp.isoformat()
             })
             
         finally:
             # Clean up temporary file
-            os.remove(temp_path)
-            os.rmdir(temp_dir)
+            os.remove(temp_file.name)
     
+    except RequestEntityTooLarge:
+        return jsonify({'error': 'Audio file is too large (16MB max)'}), 413
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/entries')
 def get_entries():
     """API endpoint to get today's entries"""
+    _wait_for_pending_storage()
     entries = get_today_entries()
     return jsonify(entries)
 
 @app.route('/daily_totals')
 def get_daily_totals_api():
     """API endpoint to get daily macro totals"""
+    _wait_for_pending_storage()
     totals = get_daily_totals()
     return jsonify(totals)
 
@@ -94,7 +167,8 @@ def test_pipeline():
         }), 404
     
     try:
-        transcription = transcribe_file(test_audio)
+        # Bypass the transcript cache so this really exercises the Whisper call
+        transcription = transcribe_file(test_audio, use_cache=False)
         parsed_data = process_food_text(transcription)
         
         return jsonify({
@@ -118,8 +192,10 @@ if __name__ == '__main__':
     print("Access the app at: http://localhost:8080")
     print("Test pipeline at: http://localhost:8080/test_pipeline")
     
-    # Create necessary directories
-    os.makedirs('logs', exist_ok=True)
+    # Create necessary directories (logs/ is created when storage is imported)
     os.makedirs('test_data', exist_ok=True)
     
+    # Load the parser prompt and Groq client once, before the first upload needs them
+    warm_up()
+    
     app.run(debug=True, host='0.0.0.0', port=8080)
\ No newline at end of file
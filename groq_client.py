@@ -0,0 +1,22 @@
+import os
+from functools import lru_cache
+from dotenv import load_dotenv
+from groq import Groq, DefaultHttpxClient
+
+# One .env load for every module that talks to Groq; importers read their own settings
+# (FOOD_MODEL, TRANSCRIPT_CACHE_PATH) after this runs. Exported variables take precedence
+load_dotenv()
+
+@lru_cache(maxsize=1)
+def get_client() -> Groq:
+    """
+    Groq client shared by transcription and food parsing, so both reuse
+    one keep-alive connection pool to the API
+    """
+    # The SDK retries 408/409/429/5xx with jittered exponential backoff (capped, honoring
+    # Retry-After) and fails fast on other 4xx. GROQ_MAX_RETRIES defaults to the SDK's own 2;
+    # each extra retry adds up to one more backoff plus request to the worst-case latency
+    max_retries = int(os.getenv('GROQ_MAX_RETRIES', '2'))
+    # HTTP/2 lets concurrent transcription and parsing calls multiplex over one TLS
+    # connection; DefaultHttpxClient keeps the SDK's own timeout and pool limits
+    return Groq(max_retries=max_retries, http_client=DefaultHttpxClient(http2=True))
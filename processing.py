@@ -1,30 +1,49 @@
 import os
 import json
+import logging
+import orjson
 import yaml
 import re
-from groq import Groq
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from groq_client import get_client
 
-load_dotenv()
+log = logging.getLogger(__name__)
 
+# Small, fast model is enough for the {food, quantity} schema; override with FOOD_MODEL
+FOOD_MODEL = os.getenv('FOOD_MODEL', 'llama-3.1-8b-instant')
+
+# Sentences parsed separately lose context ("I had grilled chicken. It was about 200 grams."),
+# so descriptions go to the LLM whole; only very long ones are split on sentence boundaries
+# and the chunks parsed in parallel
+MAX_CHUNK_CHARS = 4000
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+_CHUNK_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+
+@lru_cache(maxsize=1)
 def _load_prompt() -> str:
-    """Load the food parsing prompt from YAML file"""
+    """Load the food parsing prompt from YAML file (parsed once, then cached)"""
     prompt_path = "processing/prompts/parser.yaml"
     with open(prompt_path, 'r') as file:
         prompts = yaml.safe_load(file)
         return prompts['food_parsing_prompt']
 
+def warm_up() -> None:
+    """Load the parser prompt and Groq client ahead of the first parse"""
+    _load_prompt()
+    get_client()
+
 def _load_nutrition_database() -> dict:
     """Load the nutrition database from JSON file"""
     db_path = "data/nutrition_db.json"
     try:
-        with open(db_path, 'r') as file:
-            return json.load(file)
+        with open(db_path, 'rb') as file:
+            return orjson.loads(file.read())
     except FileNotFoundError:
-        print(f"Warning: Nutrition database not found at {db_path}")
+        log.warning("Nutrition database not found at %s", db_path)
         return {}
-    except json.JSONDecodeError:
-        print(f"Warning: Invalid JSON in nutrition database at {db_path}")
+    except orjson.JSONDecodeError:
+        log.warning("Invalid JSON in nutrition database at %s", db_path)
         return {}
 
 def _parse_quantity(quantity_str: str) -> float:
@@ -88,11 +107,11 @@ def _lookup_nutrition(food_name: str, quantity: str) -> dict:
     # Try partial matching
     for db_food in nutrition_db:
         if food_key in db_food or db_food in food_key:
-            print(f"Partial match found: '{food_name}' -> '{db_food}'")
+            log.debug("Partial match found: '%s' -> '%s'", food_name, db_food)
             return _calculate_macros(nutrition_db[db_food], quantity)
     
     # No match found
-    print(f"Warning: No nutritional data found for '{food_name}' (quantity: {quantity})")
+    log.warning("No nutritional data found for '%s' (quantity: %s)", food_name, quantity)
     return {
         "calories": 0,
         "protein_g": 0,
@@ -100,6 +119,47 @@ def _lookup_nutrition(food_name: str, quantity: str) -> dict:
         "fat_g": 0
     }
 
+def _split_text(text: str, max_chars: int = MAX_CHUNK_CHARS) -> list:
+    """Split text into chunks of whole sentences, each at most max_chars where possible"""
+    chunks = []
+    current = ''
+    for sentence in _SENTENCE_BOUNDARY.split(text.strip()):
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _parse_with_llm(text: str) -> dict:
+    """Ask the LLM to turn a food description into {'items': [...]}"""
+    prompt = _load_prompt()
+    client = get_client()
+    
+    completion = client.chat.completions.create(
+        model=FOOD_MODEL,
+        messages=[
+            # Static prompt first and byte-identical every call so Groq can cache the prefix
+            {
+                "role": "system",
+                "content": prompt
+            },
+            {
+                "role": "user",
+                "content": text
+            }
+        ],
+        # JSON mode guarantees a bare JSON object - no fences or surrounding text to strip
+        response_format={"type": "json_object"},
+        temperature=0.1,
+        # Room for the items of a full MAX_CHUNK_CHARS description without truncating the JSON
+        max_tokens=2048
+    )
+    
+    return orjson.loads(completion.choices[0].message.content)
+
 def process_food_text(text: str) -> dict:
     """
     Parse natural language food description into structured data
@@ -116,35 +176,19 @@ def process_food_text(text: str) -> dict:
     if not text or not text.strip():
         raise ValueError("Empty food description provided")
     
-    prompt = _load_prompt()
-    client = Groq()
-    
-    completion = client.chat.completions.create(
-        model="qwen/qwen3-32b",
-        messages=[
-            {
-                "role": "user",
-                "content": f"{prompt}\n\n{text}"
-            }
-        ],
-        temperature=0.1,
-        max_tokens=500
-    )
-    
-    response_text = completion.choices[0].message.content.strip()
-    
-    # Parse JSON from response
-    try:
-        parsed_data = json.loads(response_text)
-    except json.JSONDecodeError:
-        # Try to extract JSON from response if wrapped in text
-        start = response_text.find('{')
-        end = response_text.rfind('}') + 1
-        if start != -1 and end != 0:
-            json_str = response_text[start:end]
-            parsed_data = json.loads(json_str)
-        else:
-            raise ValueError(f"Could not parse JSON from response: {response_text}")
+    chunks = _split_text(text, MAX_CHUNK_CHARS)
+    if len(chunks) == 1:
+        parsed_data = _parse_with_llm(text)
+    else:
+        # Each chunk is a separate LLM call - run them concurrently and merge the items in order
+        items = []
+        for result in _CHUNK_EXECUTOR.map(_parse_with_llm, chunks):
+            chunk_items = result.get('items') if isinstance(result, dict) else None
+            if isinstance(chunk_items, list):
+                items.extend(chunk_items)
+            else:
+                log.warning("Ignoring chunk reply without an items list: %r", result)
+        parsed_data = {'items': items}
     
     # Add nutrition information to each food item
     if 'items' in parsed_data:
@@ -1,6 +1,38 @@
-import json
+import logging
 import os
-from datetime import datetime
+import orjson
+import threading
+import time
+from datetime import datetime, timedelta
+
+log = logging.getLogger(__name__)
+
+LOGS_DIR = 'logs'
+
+# Created once here rather than on every store
+os.makedirs(LOGS_DIR, exist_ok=True)
+
+# First line of an NDJSON log that already holds its day's legacy JSON entries, so
+# readers skip the legacy file even if removing it after the migration never happened
+_MIGRATED_HEADER = b'{"migrated_from_json":true}\n'
+
+# Parsed daily logs keyed by date: date_str -> (file versions, entries, daily_totals)
+_log_cache = {}
+_log_lock = threading.Lock()
+
+# Today's date string and the time.time() at which it expires (next local midnight)
+_today = ('', 0.0)
+
+def _today_str() -> str:
+    """Today's date as YYYY-MM-DD, only re-formatted once the day rolls over"""
+    global _today
+    date_str, expires_at = _today
+    if time.time() >= expires_at:
+        now = datetime.now()
+        next_midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        date_str = now.strftime('%Y-%m-%d')
+        _today = (date_str, next_midnight.timestamp())
+    return date_str
 
 def _calculate_daily_totals(entries: list) -> dict:
     """Calculate total macros for all entries in a day"""
@@ -29,9 +61,130 @@ def _calculate_daily_totals(entries: list) -> dict:
         "fat_g": round(totals["fat_g"], 1)
     }
 
+def _entries_from_data(data) -> list:
+    """Extract the entries list from any of the legacy daily JSON layouts"""
+    # Handle both old format (list) and new format (dict with entries)
+    if isinstance(data, list):
+        return data  # Old format - direct list of entries
+    elif isinstance(data, dict) and 'entries' in data:
+        return data['entries']  # New format - entries within dict
+    else:
+        return [data]  # Single entry
+
+def _daily_log_paths(date_str: str) -> tuple:
+    """Paths of the legacy JSON log and the append-only NDJSON log for a day"""
+    legacy_path = os.path.join(LOGS_DIR, f"logs_{date_str}.json")
+    path = os.path.join(LOGS_DIR, f"logs_{date_str}.ndjson")
+    return legacy_path, path
+
+def _file_version(path: str):
+    """(mtime_ns, size) of a file, or None if it doesn't exist"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def _read_legacy_log(legacy_path: str) -> list:
+    """
+    Entries from a pre-NDJSON daily JSON log
+    
+    Raises:
+        orjson.JSONDecodeError: If the file contains invalid JSON
+    """
+    with open(legacy_path, 'rb') as file:
+        data = file.read()
+    return _entries_from_data(orjson.loads(data)) if data.strip() else []
+
+def _read_ndjson_log(path: str) -> tuple:
+    """(migrated, entries) from an NDJSON log; migrated is True if it starts with _MIGRATED_HEADER"""
+    migrated = False
+    entries = []
+    try:
+        file = open(path, 'rb')
+    except FileNotFoundError:
+        return migrated, entries
+    
+    with file:
+        for line_number, line in enumerate(file):
+            if line_number == 0 and line == _MIGRATED_HEADER:
+                migrated = True
+                continue
+            if not line.strip():
+                continue
+            try:
+                entries.append(orjson.loads(line))
+            except orjson.JSONDecodeError:
+                log.warning("Skipping malformed line in %s", path)
+    return migrated, entries
+
+def _load_daily_log(date_str: str) -> tuple:
+    """
+    Load (entries, daily_totals) for a day, using the in-memory copy unless
+    the log files changed on disk. Callers must hold _log_lock.
+    """
+    legacy_path, path = _daily_log_paths(date_str)
+    versions = (_file_version(legacy_path), _file_version(path))
+    cached = _log_cache.get(date_str)
+    if cached and cached[0] == versions:
+        return cached[1], cached[2]
+    
+    # One JSON entry per line
+    migrated, entries = _read_ndjson_log(path)
+    
+    # Entries written before the NDJSON format, unless already folded into the NDJSON log
+    if versions[0] and not migrated:
+        try:
+            entries = _read_legacy_log(legacy_path) + entries
+        except orjson.JSONDecodeError:
+            log.warning("Skipping invalid JSON in %s", legacy_path)
+    
+    daily_totals = _calculate_daily_totals(entries)
+    _log_cache[date_str] = (versions, entries, daily_totals)
+    return entries, daily_totals
+
+def _write_atomic(path: str, data: bytes) -> None:
+    """Write a file via a temp file and os.replace so readers never see a partial write"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+def _compact_daily_log(date_str: str) -> None:
+    """
+    Fold a day's legacy JSON log into its NDJSON file and remove the legacy
+    file. Callers must hold _log_lock.
+    """
+    legacy_path, path = _daily_log_paths(date_str)
+    try:
+        legacy_entries = _read_legacy_log(legacy_path)
+    except orjson.JSONDecodeError:
+        # Keep the unreadable file for manual recovery, out of the way of new entries
+        corrupt_path = legacy_path + '.corrupt'
+        os.replace(legacy_path, corrupt_path)
+        log.error("Invalid JSON in %s, moved it to %s", legacy_path, corrupt_path)
+        return
+    
+    # A header means an earlier migration already rewrote the NDJSON file but stopped
+    # before removing the legacy one - readers ignore it, so only the removal is left
+    migrated, entries = _read_ndjson_log(path)
+    if not migrated:
+        entries = legacy_entries + entries
+        lines = b''.join(orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE) for entry in entries)
+        _write_atomic(path, _MIGRATED_HEADER + lines)
+        log.info("Migrated %d entries from %s to %s", len(legacy_entries), legacy_path, path)
+    os.remove(legacy_path)
+
+def reset_cache() -> None:
+    """Forget all in-memory daily logs, e.g. after LOGS_DIR changes or files are removed"""
+    with _log_lock:
+        _log_cache.clear()
+
 def store_food_data(food_items: list, timestamp: datetime = None) -> bool:
     """
-    Store food logging entry to daily JSON file
+    Append a food logging entry to the daily NDJSON file
     
     Args:
         food_items: List of food items with 'food' and 'quantity' keys
@@ -55,103 +208,54 @@ def store_food_data(food_items: list, timestamp: datetime = None) -> bool:
         "items": food_items
     }
     
-    # Create logs directory if it doesn't exist
-    os.makedirs('logs', exist_ok=True)
-    
-    # Get daily log file path
-    filename = f"logs_{timestamp.strftime('%Y-%m-%d')}.json"
-    filepath = os.path.join('logs', filename)
-    
-    # Load existing entries or create new list
-    entries = []
-    if os.path.exists(filepath):
-        with open(filepath, 'r') as file:
-            data = json.load(file)
-            # Handle both old format (list) and new format (dict with entries)
-            if isinstance(data, list):
-                entries = data  # Old format - direct list of entries
-            elif isinstance(data, dict) and 'entries' in data:
-                entries = data['entries']  # New format - entries within dict
-            else:
-                entries = [data]  # Single entry
-    
-    # Add new entry
-    entries.append(entry)
-    
-    # Calculate daily totals and create the data structure
-    daily_totals = _calculate_daily_totals(entries)
-    daily_data = {
-        "entries": entries,
-        "daily_macros": daily_totals
-    }
+    date_str = timestamp.strftime('%Y-%m-%d')
+    legacy_path, filepath = _daily_log_paths(date_str)
     
-    # Save updated entries with daily totals
-    with open(filepath, 'w') as file:
-        json.dump(daily_data, file, indent=2)
+    with _log_lock:
+        versions = (_file_version(legacy_path), _file_version(filepath))
+        
+        # Fold a pre-NDJSON log into the NDJSON file so each day ends up with a single log
+        if versions[0] is not None:
+            _compact_daily_log(date_str)
+            versions = (None, _file_version(filepath))
+        
+        # Append a single line - no need to read or rewrite earlier entries. Binary append
+        # mode (O_APPEND) writes orjson's bytes as-is, newline included, in one write()
+        line = orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE)
+        with open(filepath, 'a+b') as file:
+            # A torn final line (crash mid-append) has no newline - end it first, or this
+            # entry would be glued onto it and skipped with it as one malformed line
+            if file.seek(0, os.SEEK_END):
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b'\n':
+                    line = b'\n' + line
+            file.write(line)
+        
+        # Extend the in-memory copy if it was current, otherwise the next read re-parses
+        cached = _log_cache.pop(date_str, None)
+        if cached and cached[0] == versions:
+            entries = cached[1] + [entry]
+            new_versions = (versions[0], _file_version(filepath))
+            _log_cache[date_str] = (new_versions, entries, _calculate_daily_totals(entries))
     
-    print(f"Stored food entry with {len(food_items)} items to {filepath}")
+    log.info("Stored food entry with %d items to %s", len(food_items), filepath)
     return True
 
 def get_today_entries() -> list:
     """Get all food entries for today"""
-    today = datetime.now()
-    filename = f"logs_{today.strftime('%Y-%m-%d')}.json"
-    filepath = os.path.join('logs', filename)
+    date_str = _today_str()
     
-    if not os.path.exists(filepath):
-        return []
-    
-    # Check if file is empty
-    if os.path.getsize(filepath) == 0:
-        return []
-    
-    with open(filepath, 'r') as file:
-        try:
-            data = json.load(file)
-            # Handle both old format (list) and new format (dict with entries)
-            if isinstance(data, list):
-                return data  # Old format - direct list of entries
-            elif isinstance(data, dict) and 'entries' in data:
-                return data['entries']  # New format - entries within dict
-            else:
-                return [data]  # Single entry
-        except json.JSONDecodeError:
-            return []
+    with _log_lock:
+        entries, _ = _load_daily_log(date_str)
+    return list(entries)
 
 def get_daily_totals() -> dict:
     """Get daily macro totals for today"""
-    today = datetime.now()
-    filename = f"logs_{today.strftime('%Y-%m-%d')}.json"
-    filepath = os.path.join('logs', filename)
+    date_str = _today_str()
     
-    if not os.path.exists(filepath):
-        return {"calories": 0, "protein_g": 0, "carbs_g": 0, "fat_g": 0}
-    
-    # Check if file is empty
-    if os.path.getsize(filepath) == 0:
-        return {"calories": 0, "protein_g": 0, "carbs_g": 0, "fat_g": 0}
-    
-    with open(filepath, 'r') as file:
-        try:
-            data = json.load(file)
-            
-            # If new format with daily_macros, return those
-            if isinstance(data, dict) and 'daily_macros' in data:
-                return data['daily_macros']
-            
-            # Otherwise calculate from entries (backward compatibility)
-            entries = []
-            if isinstance(data, list):
-                entries = data  # Old format - direct list of entries
-            elif isinstance(data, dict) and 'entries' in data:
-                entries = data['entries']  # New format - entries within dict
-            else:
-                entries = [data]  # Single entry
-                
-            return _calculate_daily_totals(entries)
-            
-        except json.JSONDecodeError:
-            return {"calories": 0, "protein_g": 0, "carbs_g": 0, "fat_g": 0}
+    with _log_lock:
+        _, daily_totals = _load_daily_log(date_str)
+    return dict(daily_totals)
 
 if __name__ == "__main__":
     # Test the storage system
@@ -0,0 +1,35 @@
+"""
+Shared pytest setup: make the project modules importable from the tests,
+skip live Groq API tests without a key, and keep the transcript cache out
+of the developer's home directory
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def pytest_configure(config):
+    """Register the marker for tests that call the live Groq API"""
+    config.addinivalue_line("markers", "groq_api: calls the live Groq API, skipped when GROQ_API_KEY is not set")
+
+def pytest_collection_modifyitems(config, items):
+    """Skip groq_api tests without a key (groq_client loads .env when the tests import it)"""
+    if os.getenv('GROQ_API_KEY'):
+        return
+    skip_live = pytest.mark.skip(reason="GROQ_API_KEY not set")
+    for item in items:
+        if 'groq_api' in item.keywords:
+            item.add_marker(skip_live)
+
+@pytest.fixture(autouse=True)
+def _empty_transcript_cache(tmp_path):
+    """Give each test a fresh transcript cache, so transcription tests really reach Whisper"""
+    import transcription
+    original_path = transcription.TRANSCRIPT_CACHE_PATH
+    transcription.TRANSCRIPT_CACHE_PATH = str(tmp_path / 'transcripts.sqlite')
+    transcription._get_cache.cache_clear()
+    yield
+    transcription._get_cache.cache_clear()
+    transcription.TRANSCRIPT_CACHE_PATH = original_path
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Test the Flask upload endpoint with transcription and parsing stubbed out
+"""
+import io
+import shutil
+import tempfile
+import time
+from unittest.mock import patch
+
+from werkzeug.exceptions import RequestEntityTooLarge
+
+import app as app_module
+import storage
+
+_original_logs_dir = storage.LOGS_DIR
+
+STUB_TRANSCRIPT = "I ate 150 grams of chicken"
+STUB_ITEMS = [
+    {"food": "chicken breast", "quantity": "150 grams",
+     "macros": {"calories": 248, "protein_g": 46.5, "carbs_g": 0, "fat_g": 5.4}}
+]
+
+def setup_module():
+    """Write logs to a private temporary directory so parallel test workers don't collide"""
+    storage.LOGS_DIR = tempfile.mkdtemp(prefix='food_logs_')
+    storage.reset_cache()
+
+def teardown_module():
+    """Remove the temporary logs directory once background storage has finished with it"""
+    app_module._wait_for_pending_storage()
+    shutil.rmtree(storage.LOGS_DIR, ignore_errors=True)
+    storage.LOGS_DIR = _original_logs_dir
+    storage.reset_cache()
+
+class _StubPipeline:
+    """Stand-ins for transcribe_file and process_food_text that record the uploaded audio"""
+    
+    def __init__(self):
+        self.uploads = []
+    
+    def transcribe_file(self, path, **kwargs):
+        with open(path, 'rb') as file:
+            self.uploads.append((path, file.read()))
+        return STUB_TRANSCRIPT
+    
+    def process_food_text(self, text):
+        return {'items': [dict(item) for item in STUB_ITEMS]}
+
+def _patched_pipeline(pipeline):
+    """Patch the app's pipeline steps with a _StubPipeline"""
+    return patch.multiple(app_module, transcribe_file=pipeline.transcribe_file,
+                          process_food_text=pipeline.process_food_text)
+
+def test_raw_upload():
+    """Test a raw octet-stream body is saved with its extension and run through the pipeline"""
+    print("📤 Testing raw audio upload...")
+    
+    pipeline = _StubPipeline()
+    with _patched_pipeline(pipeline):
+        response = app_module.app.test_client().post(
+            '/upload_audio?filename=recording.webm', data=b'raw audio bytes',
+            content_type='application/octet-stream'
+        )
+    
+    assert response.status_code == 200, f"Unexpected status {response.status_code}: {response.json}"
+    assert response.json['transcription'] == STUB_TRANSCRIPT
+    path, audio = pipeline.uploads[0]
+    assert path.endswith('.webm') and audio == b'raw audio bytes', f"Upload saved as {path}: {audio!r}"
+    
+    # A bare extension and an upper-case one keep the same suffix allowed_file validated
+    with _patched_pipeline(pipeline):
+        for filename in ('.wav', 'Recording.MP3'):
+            response = app_module.app.test_client().post(
+                f'/upload_audio?filename={filename}', data=b'raw audio bytes',
+                content_type='application/octet-stream'
+            )
+            assert response.status_code == 200, f"{filename}: status {response.status_code}: {response.json}"
+    suffixes = [path.rpartition('.')[2] for path, _ in pipeline.uploads[1:]]
+    assert suffixes == ['wav', 'mp3'], f"Unexpected saved suffixes: {suffixes}"
+    
+    print("✅ Raw upload saved and processed")
+
+def test_multipart_upload():
+    """Test a multipart form upload is saved with its extension and run through the pipeline"""
+    print("📎 Testing multipart audio upload...")
+    
+    pipeline = _StubPipeline()
+    with _patched_pipeline(pipeline):
+        response = app_module.app.test_client().post(
+            '/upload_audio', data={'audio': (io.BytesIO(b'form audio bytes'), 'recording.wav')},
+            content_type='multipart/form-data'
+        )
+    
+    assert response.status_code == 200, f"Unexpected status {response.status_code}: {response.json}"
+    path, audio = pipeline.uploads[0]
+    assert path.endswith('.wav') and audio == b'form audio bytes', f"Upload saved as {path}: {audio!r}"
+    
+    print("✅ Multipart upload saved and processed")
+
+def test_oversize_uploads():
+    """Test raw, multipart and chunked (no Content-Length) uploads over the limit get a 413"""
+    print("📏 Testing oversize uploads...")
+    
+    pipeline = _StubPipeline()
+    client = app_module.app.test_client()
+    too_large = b'x' * 2048
+    with _patched_pipeline(pipeline), patch.dict(app_module.app.config, {'MAX_CONTENT_LENGTH': 1024}):
+        responses = {
+            'raw': client.post('/upload_audio?filename=recording.webm', data=too_large,
+                               content_type='application/octet-stream'),
+            'multipart': client.post('/upload_audio', data={'audio': (io.BytesIO(too_large), 'recording.wav')},
+                                     content_type='multipart/form-data'),
+            # No Content-Length, as with chunked transfer encoding - the server terminates the stream
+            'chunked': client.post('/upload_audio?filename=recording.webm', input_stream=io.BytesIO(too_large),
+                                   content_type='application/octet-stream',
+                                   environ_overrides={'wsgi.input_terminated': True}),
+        }
+    
+    statuses = {kind: response.status_code for kind, response in responses.items()}
+    assert statuses == {'raw': 413, 'multipart': 413, 'chunked': 413}, f"Unexpected statuses: {statuses}"
+    assert not pipeline.uploads, "Oversize uploads should never reach transcription"
+    
+    print(f"✅ Oversize uploads rejected: {statuses}")
+
+def test_upload_byte_counter():
+    """Test the copy loop itself stops an unbounded stream at max_bytes"""
+    print("🧮 Testing upload byte counter...")
+    
+    destination = io.BytesIO()
+    with patch.object(app_module, 'UPLOAD_CHUNK_SIZE', 256):
+        try:
+            app_module._save_upload_stream(io.BytesIO(b'x' * 2048), destination, max_bytes=1000)
+            error = None
+        except RequestEntityTooLarge as e:
+            error = e
+    
+    assert error is not None, "Stream over max_bytes was not cut off"
+    assert len(destination.getvalue()) <= 1000, f"Wrote {len(destination.getvalue())} bytes past the limit"
+    
+    print(f"✅ Stream cut off after {len(destination.getvalue())} bytes")
+
+def test_reads_see_background_writes():
+    """Test /entries and /daily_totals include an entry still being stored in the background"""
+    print("🔁 Testing reads after an upload...")
+    
+    def slow_store(items, timestamp=None):
+        time.sleep(0.2)  # Still queued when the reads below arrive, unless they wait for it
+        return storage.store_food_data(items, timestamp)
+    
+    client = app_module.app.test_client()
+    entries_before = client.get('/entries').json
+    calories_before = client.get('/daily_totals').json['calories']
+    
+    with _patched_pipeline(_StubPipeline()), patch.object(app_module, 'store_food_data', slow_store):
+        response = client.post('/upload_audio?filename=recording.webm', data=b'raw audio bytes',
+                               content_type='application/octet-stream')
+        entries = client.get('/entries').json
+        totals = client.get('/daily_totals').json
+    
+    assert response.status_code == 200, f"Unexpected status {response.status_code}: {response.json}"
+    assert len(entries) == len(entries_before) + 1 and entries[-1]['items'] == STUB_ITEMS, \
+        f"New entry missing from /entries: {entries[-1:]}"
+    assert totals['calories'] == calories_before + STUB_ITEMS[0]['macros']['calories'], \
+        f"New entry missing from /daily_totals: {totals}"
+    
+    print(f"✅ Entry visible right after the upload: {totals['calories']} cal today")
+
+def test_storage_failure_is_logged():
+    """Test a store_food_data error in the background is logged rather than swallowed"""
+    print("🚨 Testing background storage failure...")
+    
+    def failing_store(items, timestamp=None):
+        raise OSError("disk full")
+    
+    with _patched_pipeline(_StubPipeline()), patch.object(app_module, 'store_food_data', failing_store), \
+         patch.object(app_module.log, 'error') as log_error:
+        response = app_module.app.test_client().post(
+            '/upload_audio?filename=recording.webm', data=b'raw audio bytes',
+            content_type='application/octet-stream'
+        )
+        app_module._wait_for_pending_storage()
+    
+    # The response was sent before the write ran, so it can't reflect the failure
+    assert response.status_code == 200, f"Unexpected status {response.status_code}: {response.json}"
+    assert log_error.call_count == 1, "Storage failure was not logged"
+    error = log_error.call_args.kwargs.get('exc_info')
+    assert isinstance(error, OSError) and str(error) == "disk full", f"Logged the wrong error: {error!r}"
+    
+    print("✅ Storage failure logged with its traceback")
+
+if __name__ == "__main__":
+    setup_module()
+    try:
+        test_raw_upload()
+        test_multipart_upload()
+        test_oversize_uploads()
+        test_upload_byte_counter()
+        test_reads_see_background_writes()
+        test_storage_failure_is_logged()
+    finally:
+        teardown_module()
@@ -2,14 +2,55 @@
 """
 Test nutrition lookup and macro calculations
 """
-import os
-import sys
 import json
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import shutil
+import tempfile
 
+import storage
 from processing import _lookup_nutrition, _calculate_macros, _parse_quantity
 from storage import store_food_data, get_daily_totals, _calculate_daily_totals
 
+_original_logs_dir = storage.LOGS_DIR
+
+def setup_module():
+    """Write logs to a private temporary directory so parallel test workers don't collide"""
+    storage.LOGS_DIR = tempfile.mkdtemp(prefix='food_logs_')
+    storage.reset_cache()
+
+def teardown_module():
+    """Remove the temporary logs directory"""
+    shutil.rmtree(storage.LOGS_DIR, ignore_errors=True)
+    storage.LOGS_DIR = _original_logs_dir
+    storage.reset_cache()
+
+# Entries with known macro values for the daily totals test
+DAILY_TOTALS_ENTRIES = [
+    {
+        "items": [
+            {
+                "food": "chicken", 
+                "quantity": "100g",
+                "macros": {"calories": 100, "protein_g": 20, "carbs_g": 0, "fat_g": 2}
+            },
+            {
+                "food": "rice",
+                "quantity": "1 cup", 
+                "macros": {"calories": 200, "protein_g": 4, "carbs_g": 44, "fat_g": 0.5}
+            }
+        ]
+    },
+    {
+        "items": [
+            {
+                "food": "banana",
+                "quantity": "1 piece",
+                "macros": {"calories": 89, "protein_g": 1.1, "carbs_g": 23, "fat_g": 0.3}
+            }
+        ]
+    }
+]
+DAILY_TOTALS_EXPECTED = {"calories": 389, "protein_g": 25.1, "carbs_g": 67, "fat_g": 2.8}
+
 def test_nutrition_lookup():
     """Test nutrition database lookup"""
     print("🥗 Testing nutrition database lookup...")
@@ -25,19 +66,11 @@ def test_nutrition_lookup():
         result = _lookup_nutrition(food, quantity)
         
         if should_find:
-            if result['calories'] > 0:
-                print(f"✅ Found {food}: {result['calories']} cal, {result['protein_g']}g protein")
-            else:
-                print(f"❌ Expected to find {food} but got zero calories")
-                return False
+            assert result['calories'] > 0, f"Expected to find {food} but got zero calories"
+            print(f"✅ Found {food}: {result['calories']} cal, {result['protein_g']}g protein")
         else:
-            if result['calories'] == 0:
-                print(f"✅ Correctly didn't find {food}")
-            else:
-                print(f"❌ Unexpectedly found data for {food}")
-                return False
-    
-    return True
+            assert result['calories'] == 0, f"Unexpectedly found data for {food}"
+            print(f"✅ Correctly didn't find {food}")
 
 def test_quantity_parsing():
     """Test quantity string parsing"""
@@ -54,13 +87,8 @@ def test_quantity_parsing():
     
     for quantity_str, expected_value, test_type in test_cases:
         result = _parse_quantity(quantity_str)
-        if abs(result - expected_value) < 0.1:
-            print(f"✅ {quantity_str} -> {result}")
-        else:
-            print(f"❌ {quantity_str} -> {result}, expected ~{expected_value}")
-            return False
-    
-    return True
+        assert abs(result - expected_value) < 0.1, f"{quantity_str} -> {result}, expected ~{expected_value}"
+        print(f"✅ {quantity_str} -> {result}")
 
 def test_macro_calculations():
     """Test macro scaling calculations"""
@@ -80,66 +108,26 @@ def test_macro_calculations():
         result = _calculate_macros(base_nutrition, quantity_str)
         expected_calories = int(base_nutrition["calories"] * expected_factor)
         
-        if abs(result["calories"] - expected_calories) <= 1:  # Allow 1 calorie rounding difference
-            print(f"✅ {quantity_str}: {result['calories']} cal (expected ~{expected_calories})")
-        else:
-            print(f"❌ {quantity_str}: {result['calories']} cal, expected ~{expected_calories}")
-            return False
-    
-    return True
+        # Allow 1 calorie rounding difference
+        assert abs(result["calories"] - expected_calories) <= 1, \
+            f"{quantity_str}: {result['calories']} cal, expected ~{expected_calories}"
+        print(f"✅ {quantity_str}: {result['calories']} cal (expected ~{expected_calories})")
 
 def test_daily_totals():
     """Test daily totals calculation"""
     print("📈 Testing daily totals calculation...")
     
-    # Create test entries with known macro values
-    test_entries = [
-        {
-            "items": [
-                {
-                    "food": "chicken", 
-                    "quantity": "100g",
-                    "macros": {"calories": 100, "protein_g": 20, "carbs_g": 0, "fat_g": 2}
-                },
-                {
-                    "food": "rice",
-                    "quantity": "1 cup", 
-                    "macros": {"calories": 200, "protein_g": 4, "carbs_g": 44, "fat_g": 0.5}
-                }
-            ]
-        },
-        {
-            "items": [
-                {
-                    "food": "banana",
-                    "quantity": "1 piece",
-                    "macros": {"calories": 89, "protein_g": 1.1, "carbs_g": 23, "fat_g": 0.3}
-                }
-            ]
-        }
-    ]
-    
-    totals = _calculate_daily_totals(test_entries)
-    expected = {"calories": 389, "protein_g": 25.1, "carbs_g": 67, "fat_g": 2.8}
+    totals = _calculate_daily_totals(DAILY_TOTALS_ENTRIES)
     
-    for key in expected:
-        if abs(totals[key] - expected[key]) < 0.1:
-            print(f"✅ Total {key}: {totals[key]} (expected {expected[key]})")
-        else:
-            print(f"❌ Total {key}: {totals[key]}, expected {expected[key]}")
-            return False
-    
-    return True
+    for key in DAILY_TOTALS_EXPECTED:
+        expected = DAILY_TOTALS_EXPECTED[key]
+        assert abs(totals[key] - expected) < 0.1, f"Total {key}: {totals[key]}, expected {expected}"
+        print(f"✅ Total {key}: {totals[key]} (expected {expected})")
 
 def test_storage_with_macros():
     """Test storage system with macro information"""
     print("💾 Testing storage with macros...")
     
-    # Clean up any existing test file
-    test_file = 'logs/logs_2025-09-06.json'
-    if os.path.exists(test_file):
-        os.remove(test_file)
-    
     # Test storing items with macros
     test_items = [
         {
@@ -149,20 +137,11 @@ def test_storage_with_macros():
         }
     ]
     
-    try:
-        store_food_data(test_items)
-        totals = get_daily_totals()
-        
-        if totals['calories'] == 165 and totals['protein_g'] == 31:
-            print("✅ Storage and retrieval working correctly")
-            return True
-        else:
-            print(f"❌ Storage test failed: {totals}")
-            return False
-            
-    except Exception as e:
-        print(f"❌ Storage test error: {e}")
-        return False
+    store_food_data(test_items)
+    totals = get_daily_totals()
+    
+    assert totals['calories'] == 165 and totals['protein_g'] == 31, f"Storage test failed: {totals}"
+    print("✅ Storage and retrieval working correctly")
 
 def run_all_tests():
     """Run all nutrition tests"""
@@ -179,11 +158,11 @@ def run_all_tests():
     passed = 0
     for test in tests:
         try:
-            if test():
-                passed += 1
-                print("✅ PASSED\n")
-            else:
-                print("❌ FAILED\n")
+            test()
+            passed += 1
+            print("✅ PASSED\n")
+        except AssertionError as e:
+            print(f"❌ FAILED: {e}\n")
         except Exception as e:
             print(f"❌ FAILED with error: {e}\n")
     
@@ -191,5 +170,9 @@ def run_all_tests():
     return passed == len(tests)
 
 if __name__ == "__main__":
-    success = run_all_tests()
+    setup_module()
+    try:
+        success = run_all_tests()
+    finally:
+        teardown_module()
     exit(0 if success else 1)
\ No newline at end of file
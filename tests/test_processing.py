@@ -2,43 +2,143 @@
 """
 Simple test for processing module
 """
-import os
-import sys
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
 
-from processing import process_food_text
+import pytest
 
+import processing
+from processing import process_food_text, _split_text
+
+TEST_DESCRIPTIONS = [
+    "I ate 150 grams of chicken and half a cup of rice",
+    "Had two eggs and a banana for breakfast",
+    "Ate some pasta with tomato sauce"
+]
+
+# Canned JSON-mode reply for TEST_DESCRIPTIONS[0]
+STUB_LLM_CONTENT = '{"items": [{"food": "chicken breast", "quantity": "150 grams"}, {"food": "rice", "quantity": "0.5 cup"}]}'
+
+class _StubCompletions:
+    """
+    Stand-in for client.chat.completions that records calls and returns a canned
+    reply, or content(user_message) when content is callable
+    """
+    
+    def __init__(self, content):
+        self.content = content
+        self.calls = []
+    
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        content = self.content(kwargs['messages'][-1]['content']) if callable(self.content) else self.content
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+@pytest.mark.groq_api
 def test_processing():
     """Test food text processing"""
-    test_descriptions = [
-        "I ate 150 grams of chicken and half a cup of rice",
-        "Had two eggs and a banana for breakfast",
-        "Ate some pasta with tomato sauce"
-    ]
-    
     print("🍽️ Testing food text processing...")
     
-    for i, desc in enumerate(test_descriptions, 1):
-        try:
-            print(f"\nTest {i}: {desc}")
-            result = process_food_text(desc)
-            
-            if result and 'items' in result:
-                print(f"✅ Processing successful!")
-                print(f"Found {len(result['items'])} food items:")
-                for item in result['items']:
-                    print(f"  - {item['food']}: {item['quantity']}")
-            else:
-                print(f"❌ Processing failed - no valid result")
-                return False
-                
-        except Exception as e:
-            print(f"❌ Processing failed with error: {e}")
-            return False
+    for i, desc in enumerate(TEST_DESCRIPTIONS, 1):
+        print(f"\nTest {i}: {desc}")
+        result = process_food_text(desc)
+        
+        assert result and 'items' in result, f"Processing failed - no valid result for {desc!r}"
+        print(f"✅ Processing successful!")
+        print(f"Found {len(result['items'])} food items:")
+        for item in result['items']:
+            print(f"  - {item['food']}: {item['quantity']}")
     
     print(f"\n✅ All processing tests passed!")
-    return True
+
+def test_processing_with_stub_client():
+    """Test parsing and nutrition lookup offline against a stubbed Groq client"""
+    print("🧩 Testing food text processing with a stub client...")
+    
+    completions = _StubCompletions(STUB_LLM_CONTENT)
+    stub_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    
+    with patch.object(processing, 'get_client', return_value=stub_client):
+        result = process_food_text(TEST_DESCRIPTIONS[0])
+    
+    request = completions.calls[0]
+    assert request['messages'][-1] == {"role": "user", "content": TEST_DESCRIPTIONS[0]}, \
+        f"Description not sent as the user message: {request['messages']}"
+    assert request.get('response_format') == {"type": "json_object"}, "JSON mode not requested"
+    
+    items = result.get('items', [])
+    assert len(items) == 2 and all(item['macros']['calories'] > 0 for item in items), f"Unexpected parsed items: {items}"
+    
+    print(f"✅ Parsed {len(items)} items with macros: {[item['macros']['calories'] for item in items]} cal")
+    
+    # Follow-up sentences depend on earlier ones, so a normal description is one request
+    completions.calls.clear()
+    with patch.object(processing, 'get_client', return_value=stub_client):
+        process_food_text("I had grilled chicken. It was about 200 grams.")
+    assert len(completions.calls) == 1, f"Description was split into {len(completions.calls)} requests"
+
+def test_text_splitting():
+    """Test long descriptions are split on sentence boundaries"""
+    print("✂️ Testing text splitting...")
+    
+    short_text = "I ate 150 grams of chicken and half a cup of rice"
+    assert _split_text(short_text) == [short_text], "Short text should stay in one chunk"
+    
+    sentences = [f"For meal {i} I had two eggs and a banana." for i in range(20)]
+    chunks = _split_text(" ".join(sentences), max_chars=100)
+    assert " ".join(chunks) == " ".join(sentences), "Chunks don't add back up to the original text"
+    assert len(chunks) >= 2 and all(len(chunk) <= 100 for chunk in chunks), \
+        f"Expected several chunks of at most 100 chars, got {[len(c) for c in chunks]}"
+    
+    print(f"✅ Split {len(sentences)} sentences into {len(chunks)} chunks")
+
+# Canned replies per chunk for the merge test; the mystery snack gets a JSON array, not an object
+CHUNK_REPLIES = {
+    "Breakfast was two eggs.": '{"items": [{"food": "eggs", "quantity": "2 pieces"}]}',
+    "Snack was a mystery.": '[]',
+    "Dinner was a banana.": '{"items": [{"food": "banana", "quantity": "1 piece"}]}',
+}
+
+def test_chunk_merge_with_stub_client():
+    """Test long descriptions are parsed per chunk and merged in order, skipping replies without items"""
+    print("🧵 Testing chunked parsing with a stub client...")
+    
+    failing_chunks = set()
+    
+    def reply(chunk):
+        # Earlier chunks answer last, so the merge must not depend on completion order
+        time.sleep(0.05 * (len(CHUNK_REPLIES) - list(CHUNK_REPLIES).index(chunk)))
+        if chunk in failing_chunks:
+            raise RuntimeError("Stub LLM call failed")
+        return CHUNK_REPLIES[chunk]
+    
+    completions = _StubCompletions(reply)
+    stub_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    text = " ".join(CHUNK_REPLIES)
+    
+    with patch.object(processing, 'get_client', return_value=stub_client), \
+         patch.object(processing, 'MAX_CHUNK_CHARS', 25):
+        result = process_food_text(text)
+        
+        failing_chunks.add("Dinner was a banana.")
+        try:
+            process_food_text(text)
+            error = None
+        except RuntimeError as e:
+            error = e
+    
+    foods = [item['food'] for item in result['items']]
+    assert len(completions.calls) == 6, f"Expected one request per chunk, got {len(completions.calls)}"
+    assert foods == ['eggs', 'banana'], f"Items not merged in chunk order: {foods}"
+    assert all('macros' in item for item in result['items']), "Merged items are missing macros"
+    assert error is not None, "Failed chunk did not propagate"
+    
+    print(f"✅ Merged {foods} from {len(CHUNK_REPLIES)} chunks, failure raised: {error}")
 
 if __name__ == "__main__":
-    success = test_processing()
-    exit(0 if success else 1)
\ No newline at end of file
+    test_text_splitting()
+    test_processing_with_stub_client()
+    test_chunk_merge_with_stub_client()
+    test_processing()
\ No newline at end of file
@@ -3,11 +3,28 @@
 Simple test for storage module
 """
 import os
-import sys
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import shutil
+import tempfile
+from datetime import datetime
 
+import orjson
+
+import storage
 from storage import store_food_data, get_today_entries
 
+_original_logs_dir = storage.LOGS_DIR
+
+def setup_module():
+    """Write logs to a private temporary directory so parallel test workers don't collide"""
+    storage.LOGS_DIR = tempfile.mkdtemp(prefix='food_logs_')
+    storage.reset_cache()
+
+def teardown_module():
+    """Remove the temporary logs directory"""
+    shutil.rmtree(storage.LOGS_DIR, ignore_errors=True)
+    storage.LOGS_DIR = _original_logs_dir
+    storage.reset_cache()
+
 def test_storage():
     """Test food data storage"""
     test_items = [
@@ -15,33 +32,90 @@ def test_storage():
         {"food": "rice", "quantity": "0.5 cup"}
     ]
     
-    try:
-        print("📋 Testing food data storage...")
-        
-        # Test storing data
-        success = store_food_data(test_items)
-        if not success:
-            print("❌ Storage failed")
-            return False
-        
-        print("✅ Storage successful!")
-        
-        # Test retrieving data
-        entries = get_today_entries()
-        print(f"Retrieved {len(entries)} entries for today:")
-        
-        for entry in entries:
-            print(f"  {entry['timestamp']}: {len(entry['items'])} items")
-            for item in entry['items']:
-                print(f"    - {item['food']}: {item['quantity']}")
-        
-        print(f"\n✅ Storage test passed!")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Storage test failed with error: {e}")
-        return False
+    print("📋 Testing food data storage...")
+    
+    # Test storing data
+    assert store_food_data(test_items), "Storage failed"
+    print("✅ Storage successful!")
+    
+    # Test retrieving data
+    entries = get_today_entries()
+    print(f"Retrieved {len(entries)} entries for today:")
+    
+    for entry in entries:
+        print(f"  {entry['timestamp']}: {len(entry['items'])} items")
+        for item in entry['items']:
+            print(f"    - {item['food']}: {item['quantity']}")
+    
+    assert any(entry['items'] == test_items for entry in entries), "Stored entry not retrieved"
+    print(f"\n✅ Storage test passed!")
+
+def test_legacy_migration():
+    """Test legacy JSON logs are migrated once, even after an interrupted migration, and corrupt ones don't block storing"""
+    print("🗃️ Testing legacy log migration...")
+    
+    timestamp = datetime(2025, 9, 6, 12, 0)
+    legacy_path, path = storage._daily_log_paths('2025-09-06')
+    legacy_log = {"entries": [{"timestamp": "2025-09-06T08:00:00", "items": [
+        {"food": "egg", "quantity": "1 piece", "macros": {"calories": 10}}
+    ]}]}
+    new_item = {"food": "toast", "quantity": "1 piece", "macros": {"calories": 5}}
+    
+    def logged_calories():
+        storage.reset_cache()
+        with storage._log_lock:
+            return storage._load_daily_log('2025-09-06')[1]['calories']
+    
+    with open(legacy_path, 'wb') as file:
+        file.write(orjson.dumps(legacy_log))
+    store_food_data([new_item], timestamp)
+    assert not os.path.exists(legacy_path) and logged_calories() == 15, \
+        f"Migration should fold the legacy entry into the NDJSON log: {logged_calories()} cal"
+    
+    # A crash between rewriting the NDJSON log and removing the legacy file leaves both behind
+    with open(legacy_path, 'wb') as file:
+        file.write(orjson.dumps(legacy_log))
+    assert logged_calories() == 15, f"Legacy entries counted twice after an interrupted migration: {logged_calories()} cal"
+    store_food_data([new_item], timestamp)
+    assert not os.path.exists(legacy_path) and logged_calories() == 20, \
+        f"Finishing an interrupted migration should not duplicate entries: {logged_calories()} cal"
+    
+    # An unreadable legacy file is moved aside instead of failing every store for the day
+    with open(legacy_path, 'wb') as file:
+        file.write(b'{"entries": [')
+    store_food_data([new_item], timestamp)
+    assert os.path.exists(legacy_path + '.corrupt') and logged_calories() == 25, \
+        f"Corrupt legacy log should be moved aside and the entry stored: {logged_calories()} cal"
+    
+    print("✅ Legacy log migrated once and corrupt log moved aside")
+
+def test_append_after_torn_line():
+    """Test an entry appended after a torn final line (no trailing newline) is kept"""
+    print("✂️ Testing append after a torn line...")
+    
+    timestamp = datetime(2025, 9, 7, 12, 0)
+    _, path = storage._daily_log_paths('2025-09-07')
+    first_item = {"food": "egg", "quantity": "1 piece"}
+    new_item = {"food": "toast", "quantity": "1 piece"}
+    
+    store_food_data([first_item], timestamp)
+    with open(path, 'ab') as file:
+        file.write(orjson.dumps({"timestamp": "2025-09-07T12:30:00", "items": [new_item]})[:20])
+    store_food_data([new_item], timestamp)
+    
+    storage.reset_cache()
+    with storage._log_lock:
+        entries, _ = storage._load_daily_log('2025-09-07')
+    assert [entry['items'] for entry in entries] == [[first_item], [new_item]], \
+        f"Entry after the torn line was lost: {entries}"
+    
+    print("✅ Torn line skipped, following entry kept")
 
 if __name__ == "__main__":
-    success = test_storage()
-    exit(0 if success else 1)
\ No newline at end of file
+    setup_module()
+    try:
+        test_storage()
+        test_legacy_migration()
+        test_append_after_torn_line()
+    finally:
+        teardown_module()
\ No newline at end of file
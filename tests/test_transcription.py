@@ -2,37 +2,147 @@
 """
 Simple test for transcription module
 """
+import itertools
 import os
-import sys
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import shutil
+import tempfile
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
 
-from transcription import transcribe_file
+import pytest
 
+import transcription
+from transcription import transcribe_file, transcribe_files, _cached_transcript, _store_transcript
+
+class _StubTranscriptions:
+    """Stand-in for client.audio.transcriptions that echoes the audio bytes back as text"""
+    
+    def __init__(self):
+        self.calls = []
+    
+    def create(self, file, **kwargs):
+        filename, handle = file
+        self.calls.append(filename)
+        text = handle.read().decode()
+        if text == 'fail':
+            raise RuntimeError(f"Stub transcription failed for {filename}")
+        # Earlier files finish later, so results only come back in order if the batch preserves it
+        time.sleep(0.05 / len(self.calls))
+        return f" {text} "
+
+@pytest.mark.groq_api
 def test_transcription():
     """Test transcription with sample audio file"""
     test_file = "test_data/sample_food_recording.wav"
     
-    if not os.path.exists(test_file):
-        print(f"❌ Test file not found: {test_file}")
-        print("Please add a sample WAV file to test_data/")
-        return False
+    assert os.path.exists(test_file), f"Test file not found: {test_file} - please add a sample WAV file to test_data/"
+    
+    print(f"🎤 Testing transcription with {test_file}...")
+    # Skip the transcript cache so every run really reaches Whisper
+    result = transcribe_file(test_file, use_cache=False)
     
+    assert result, "Transcription failed - no result returned"
+    print(f"✅ Transcription successful!")
+    print(f"Result: \"{result}\"")
+
+def test_transcript_cache():
+    """Test transcripts are cached by key and evicted least recently used first"""
+    print("🗄️ Testing transcript cache...")
+    
+    temp_dir = tempfile.mkdtemp()
+    clock = itertools.count()
+    fake_time = SimpleNamespace(time=lambda: next(clock))
+    
+    with patch.object(transcription, 'TRANSCRIPT_CACHE_PATH', os.path.join(temp_dir, 'transcripts.sqlite')), \
+         patch.object(transcription, 'TRANSCRIPT_CACHE_SIZE', 2), \
+         patch.object(transcription, 'time', fake_time):
+        transcription._get_cache.cache_clear()
+        try:
+            _store_transcript('a', 'two eggs')
+            _store_transcript('b', 'a banana')
+            _cached_transcript('a')  # 'a' is now more recently used than 'b'
+            _store_transcript('c', 'rice')
+            
+            results = {key: _cached_transcript(key) for key in 'abc'}
+        finally:
+            transcription._get_cache.cache_clear()
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    assert results == {'a': 'two eggs', 'b': None, 'c': 'rice'}, f"Unexpected cache contents: {results}"
+    print("✅ Cache hit for recent entries, least recently used entry evicted")
+
+def test_transcript_cache_settings():
+    """Test a bare relative TRANSCRIPT_CACHE_PATH works and TRANSCRIPT_CACHE_SIZE=0 turns the cache off"""
+    print("⚙️ Testing transcript cache settings...")
+    
+    temp_dir = tempfile.mkdtemp()
+    audio_path = os.path.join(temp_dir, 'recording.wav')
+    with open(audio_path, 'w') as file:
+        file.write('two eggs')
+    
+    transcriptions = _StubTranscriptions()
+    stub_client = SimpleNamespace(audio=SimpleNamespace(transcriptions=transcriptions))
+    original_dir = os.getcwd()
+    os.chdir(temp_dir)
     try:
-        print(f"🎤 Testing transcription with {test_file}...")
-        result = transcribe_file(test_file)
-        
-        if result:
-            print(f"✅ Transcription successful!")
-            print(f"Result: \"{result}\"")
-            return True
-        else:
-            print("❌ Transcription failed - no result returned")
-            return False
+        with patch.object(transcription, 'TRANSCRIPT_CACHE_PATH', 'transcripts.sqlite'), \
+             patch.object(transcription, 'get_client', return_value=stub_client):
+            transcription._get_cache.cache_clear()
+            _store_transcript('a', 'two eggs')
+            relative_hit = _cached_transcript('a')
             
-    except Exception as e:
-        print(f"❌ Transcription failed with error: {e}")
-        return False
+            with patch.object(transcription, 'TRANSCRIPT_CACHE_SIZE', 0):
+                transcribe_file(audio_path)
+                transcribe_file(audio_path)
+    finally:
+        transcription._get_cache.cache_clear()
+        os.chdir(original_dir)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    assert relative_hit == 'two eggs', "Cache at a bare relative path was not usable"
+    assert len(transcriptions.calls) == 2, f"Disabled cache still answered a call: {transcriptions.calls}"
+    
+    print("✅ Relative cache path works, size 0 always calls Whisper")
+
+def test_batch_transcription_with_stub_client():
+    """Test transcribe_files returns results in input order and propagates failures"""
+    print("📚 Testing batch transcription with a stub client...")
+    
+    temp_dir = tempfile.mkdtemp()
+    paths = []
+    for i, text in enumerate(['two eggs', 'a banana', 'rice', 'fail']):
+        path = os.path.join(temp_dir, f"recording_{i}.wav")
+        with open(path, 'w') as file:
+            file.write(text)
+        paths.append(path)
+    
+    transcriptions = _StubTranscriptions()
+    stub_client = SimpleNamespace(audio=SimpleNamespace(transcriptions=transcriptions))
+    
+    with patch.object(transcription, 'TRANSCRIPT_CACHE_PATH', os.path.join(temp_dir, 'transcripts.sqlite')), \
+         patch.object(transcription, 'get_client', return_value=stub_client):
+        transcription._get_cache.cache_clear()
+        try:
+            results = transcribe_files(paths[:3])
+            # The first three are cache hits now, so only the failing file reaches the stub
+            try:
+                transcribe_files(paths)
+                error = None
+            except RuntimeError as e:
+                error = e
+        finally:
+            transcription._get_cache.cache_clear()
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    assert results == ['two eggs', 'a banana', 'rice'], f"Results not in input order: {results}"
+    assert len(transcriptions.calls) == 4, f"Expected 3 Whisper calls plus the failing one, got {transcriptions.calls}"
+    assert error is not None, "Failed transcription did not propagate"
+    
+    print(f"✅ {len(results)} transcripts in input order, failure raised: {error}")
 
 if __name__ == "__main__":
-    success = test_transcription()
-    exit(0 if success else 1)
\ No newline at end of file
+    test_transcript_cache()
+    test_transcript_cache_settings()
+    test_batch_transcription_with_stub_client()
+    test_transcription()
\ No newline at end of file
@@ -1,15 +1,93 @@
+import hashlib
+import logging
 import os
-from groq import Groq
-from dotenv import load_dotenv
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from groq_client import get_client
 
-load_dotenv()
+log = logging.getLogger(__name__)
 
-def transcribe_file(audio_file_path: str) -> str:
+WHISPER_MODEL = "whisper-large-v3-turbo"
+
+# Audio extensions Whisper accepts, lowercase and without the dot
+SUPPORTED_FORMATS = frozenset({'wav', 'webm', 'mp3', 'm4a', 'ogg'})
+
+# Transcripts of previously seen audio, keyed by content hash, least recently used evicted first
+TRANSCRIPT_CACHE_PATH = os.path.expanduser(
+    os.getenv('TRANSCRIPT_CACHE_PATH', '~/.cache/voice_food_logger/transcripts.sqlite')
+)
+# Set TRANSCRIPT_CACHE_SIZE=0 to turn the cache off
+TRANSCRIPT_CACHE_SIZE = int(os.getenv('TRANSCRIPT_CACHE_SIZE', '500'))
+_cache_lock = threading.Lock()
+
+# Uploads are network-bound, so a few threads overlap them well
+_TRANSCRIBE_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+
+@lru_cache(maxsize=1)
+def _get_cache() -> sqlite3.Connection:
+    """Open the transcript cache database, creating it on first use"""
+    # A bare filename has no directory part - it lives in the working directory
+    os.makedirs(os.path.dirname(TRANSCRIPT_CACHE_PATH) or '.', exist_ok=True)
+    connection = sqlite3.connect(TRANSCRIPT_CACHE_PATH, check_same_thread=False)
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS transcripts "
+        "(digest TEXT PRIMARY KEY, text TEXT NOT NULL, last_used REAL NOT NULL)"
+    )
+    return connection
+
+def _audio_digest(file) -> str:
+    """Cache key for an open audio file: BLAKE2b hash of its contents plus the model name"""
+    # Dedupe only, not security - BLAKE2b is faster than SHA-256 on CPUs without SHA extensions
+    digest = hashlib.blake2b(digest_size=16)
+    for chunk in iter(lambda: file.read(1 << 20), b''):
+        digest.update(chunk)
+    file.seek(0)
+    return f"{WHISPER_MODEL}:{digest.hexdigest()}"
+
+def _cached_transcript(digest: str):
+    """Return the cached transcript for digest, or None on a miss"""
+    try:
+        with _cache_lock:
+            connection = _get_cache()
+            row = connection.execute("SELECT text FROM transcripts WHERE digest = ?", (digest,)).fetchone()
+            if row is not None:
+                connection.execute("UPDATE transcripts SET last_used = ? WHERE digest = ?", (time.time(), digest))
+                connection.commit()
+    except (sqlite3.Error, OSError) as e:
+        log.warning("Transcript cache unavailable: %s", e)
+        return None
+    return row[0] if row is not None else None
+
+def _store_transcript(digest: str, text: str) -> None:
+    """Save a transcript and evict the least recently used beyond TRANSCRIPT_CACHE_SIZE"""
+    try:
+        with _cache_lock:
+            connection = _get_cache()
+            connection.execute(
+                "INSERT OR REPLACE INTO transcripts (digest, text, last_used) VALUES (?, ?, ?)",
+                (digest, text, time.time())
+            )
+            connection.execute(
+                "DELETE FROM transcripts WHERE digest NOT IN "
+                "(SELECT digest FROM transcripts ORDER BY last_used DESC LIMIT ?)",
+                (TRANSCRIPT_CACHE_SIZE,)
+            )
+            connection.commit()
+    except (sqlite3.Error, OSError) as e:
+        log.warning("Could not cache transcript: %s", e)
+
+def transcribe_file(audio_file_path: str, use_cache: bool = True) -> str:
     """
     Transcribe an audio file using Groq Whisper API
     
     Args:
         audio_file_path: Path to audio file (WAV, WebM, MP3, etc.)
+        use_cache: Look up and save the transcript in the on-disk cache (unless
+            TRANSCRIPT_CACHE_SIZE is 0); pass False to always call Whisper, e.g.
+            when checking the API itself
         
     Returns:
         Transcribed text
@@ -17,24 +95,58 @@ def transcribe_file(audio_file_path: str) -> str:
     Raises:
         Exception: If transcription fails
     """
-    if not os.path.exists(audio_file_path):
-        raise FileNotFoundError(f"Audio file not found: {audio_file_path}")
+    use_cache = use_cache and TRANSCRIPT_CACHE_SIZE > 0
     
     # Groq Whisper supports various audio formats, not just WAV
-    supported_formats = ['.wav', '.webm', '.mp3', '.m4a', '.ogg']
-    if not any(audio_file_path.lower().endswith(fmt) for fmt in supported_formats):
-        raise ValueError(f"Audio format not supported. Supported formats: {', '.join(supported_formats)}")
+    filename = os.path.basename(audio_file_path)
     
-    client = Groq()
+    # Lowercase only the extension, not the whole path, and look it up in a set
+    _, dot, extension = filename.rpartition('.')
+    if not dot or extension.lower() not in SUPPORTED_FORMATS:
+        supported = ', '.join(f'.{fmt}' for fmt in sorted(SUPPORTED_FORMATS))
+        raise ValueError(f"Audio format not supported. Supported formats: {supported}")
+    
+    # Open directly rather than exists() + open(): one syscall and no race with deletion
+    try:
+        file = open(audio_file_path, "rb")
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Audio file not found: {audio_file_path}")
     
-    with open(audio_file_path, "rb") as file:
-        transcription = client.audio.transcriptions.create(
-            file=(os.path.basename(audio_file_path), file.read()),
-            model="whisper-large-v3-turbo",
+    with file:
+        # Same audio as before (e.g. a retried upload) - skip the Whisper round trip
+        if use_cache:
+            digest = _audio_digest(file)
+            cached = _cached_transcript(digest)
+            if cached is not None:
+                log.debug("Transcript cache hit for %s", filename)
+                return cached
+        
+        # Pass the open handle so the upload streams from the file instead of a full in-memory copy
+        transcription = get_client().audio.transcriptions.create(
+            file=(filename, file),
+            model=WHISPER_MODEL,
             response_format="text",
         )
     
-    return transcription.strip()
+    text = transcription.strip()
+    if use_cache:
+        _store_transcript(digest, text)
+    return text
+
+def transcribe_files(audio_file_paths: list) -> list:
+    """
+    Transcribe several audio files concurrently using the shared Groq client
+    
+    Args:
+        audio_file_paths: Paths to audio files (WAV, WebM, MP3, etc.)
+        
+    Returns:
+        Transcribed text for each file, in the same order as the paths
+        
+    Raises:
+        Exception: If any transcription fails
+    """
+    return list(_TRANSCRIBE_EXECUTOR.map(transcribe_file, audio_file_paths))
 
 if __name__ == "__main__":
     test_file = "test_data/sample_food_recording.wav"